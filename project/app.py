@@ -1,3 +1,6 @@
+import io
+import re
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
@@ -6,12 +9,40 @@ from plotly.subplots import make_subplots
 import numpy as np
 from sqlalchemy import create_engine
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 import plotly.figure_factory as ff
 from sqlalchemy import text
 
+# Optional accelerator: when numba is installed the Data Quality anomaly
+# scan runs as one JIT-compiled parallel pass instead of four pandas scans
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def anomaly_counts(time_dev, dist, same_loc):
+        neg = 0
+        ext = 0
+        zero = 0
+        same = 0
+        for i in prange(time_dev.shape[0]):
+            if time_dev[i] < -60:
+                neg += 1
+            if time_dev[i] > 300:
+                ext += 1
+            if dist[i] == 0:
+                zero += 1
+            if same_loc[i]:
+                same += 1
+        return neg, ext, zero, same
+else:
+    anomaly_counts = None
+
 # Page configuration
 st.set_page_config(
-    page_title="Delhivery Logistics Dashboard", 
+    page_title="Delhivery Logistics Dashboard",
     layout="wide",
     initial_sidebar_state="expanded",
     page_icon="🚚"
@@ -43,101 +74,422 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Connect to PostgreSQL
+# Connect to PostgreSQL. One pooled engine is shared by every session: a
+# bounded pool keeps concurrent users from opening a connection per query,
+# pre-ping drops stale connections, and the statement timeout stops a runaway
+# query from pinning a pool slot
 @st.cache_resource
 def init_connection():
     pg = st.secrets["postgres"]
-    return create_engine(f"postgresql+psycopg2://{pg.user}:{pg.password}@{pg.host}:{pg.port}/{pg.database}")
+    return create_engine(
+        f"postgresql+psycopg2://{pg.user}:{pg.password}@{pg.host}:{pg.port}/{pg.database}",
+        pool_size=8,
+        max_overflow=4,
+        pool_pre_ping=True,
+        connect_args={"options": "-c statement_timeout=30s"}
+    )
 
 engine = init_connection()
 
-# Enhanced data loading with error handling
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def load_data():
+# Enhanced data loading with error handling. The sidebar filters are pushed
+# down as WHERE clauses so only the selected slice ever leaves Postgres; the
+# filter tuple doubles as the cache key
+@st.cache_data(ttl=300, max_entries=32)  # Cache for 5 minutes
+def load_data(start_date, end_date, route_type, source, dest):
     try:
+        where, params = build_filters(start_date, end_date, route_type, source, dest)
+        # Only the columns the dashboard actually reads, cast to real where
+        # FP32 precision suffices, so we don't drag the whole fact table over
         query = """
-        SELECT f.*, 
+        SELECT f.route_type,
+               f.is_cutoff,
+               CAST(f.actual_time AS real) AS actual_time,
+               CAST(f.osrm_time AS real) AS osrm_time,
+               CAST(f.time_deviation AS real) AS time_deviation,
+               CAST(f.actual_distance_to_destination AS real) AS actual_distance_to_destination,
+               CAST(f.osrm_distance AS real) AS osrm_distance,
+               CAST(f.segment_factor AS real) AS segment_factor,
                src.center_name AS source_name,
-               src.center_code AS source_code,
                dest.center_name AS dest_name,
-               dest.center_code AS dest_code,
                d.full_date,
-               d.day_of_week,
                d.is_weekend,
-               d.month,
-               d.year,
                v.vehicle_type
         FROM fact_trips f
         JOIN dim_location src ON f.source_location_id = src.location_id
         JOIN dim_location dest ON f.destination_location_id = dest.location_id
         JOIN dim_date d ON f.date_id = d.date_id
         JOIN dim_vehicles v ON f.vehicle_id = v.vehicle_id
-        """
-        df = pd.read_sql(query, engine)
-        df['full_date'] = pd.to_datetime(df['full_date'])
-        df['route'] = df['source_name'] + ' → ' + df['dest_name']
-        df['efficiency_ratio'] = df['osrm_time'] / df['actual_time'].replace(0, np.nan)
-        df['distance_efficiency'] = df['osrm_distance'] / df['actual_distance_to_destination'].replace(0, np.nan)
+        WHERE {where}
+        """.format(where=where)
+        # COPY ... TO STDOUT bypasses the driver's per-cell Python object
+        # construction entirely; the CSV bytes are parsed back with pandas'
+        # multi-threaded C reader, which also applies the dtypes in one pass
+        copy_sql = re.sub(r':(\w+)', r'%(\1)s', query)
+        raw = engine.raw_connection()
+        try:
+            cur = raw.cursor()
+            inlined = cur.mogrify(copy_sql, params).decode()
+            buf = io.BytesIO()
+            cur.copy_expert(f"COPY ({inlined}) TO STDOUT WITH CSV HEADER", buf)
+        finally:
+            raw.close()
+        buf.seek(0)
+        df = pd.read_csv(
+            buf,
+            parse_dates=['full_date'],
+            dtype={
+                'actual_time': 'float32',
+                'osrm_time': 'float32',
+                'time_deviation': 'float32',
+                'actual_distance_to_destination': 'float32',
+                'osrm_distance': 'float32',
+                'segment_factor': 'float32'
+            }
+        )
+        if df.empty:
+            return df
+        # COPY CSV serializes booleans as t/f
+        df['is_cutoff'] = df['is_cutoff'] == 't'
+        df['is_weekend'] = df['is_weekend'] == 't'
+        for col in ['route_type', 'source_name', 'dest_name', 'vehicle_type']:
+            df[col] = df[col].astype('category')
+        df['route'] = (df['source_name'].astype(str) + ' → ' + df['dest_name'].astype(str)).astype('category')
+        # Guarded divides on the raw arrays: one pass each, no intermediate
+        # .replace(0, nan) copy of the denominator column
+        actual_time = df['actual_time'].to_numpy()
+        actual_dist = df['actual_distance_to_destination'].to_numpy()
+        df['efficiency_ratio'] = np.divide(
+            df['osrm_time'].to_numpy(), actual_time,
+            out=np.full(len(df), np.nan, dtype=np.float32), where=actual_time != 0)
+        df['distance_efficiency'] = np.divide(
+            df['osrm_distance'].to_numpy(), actual_dist,
+            out=np.full(len(df), np.nan, dtype=np.float32), where=actual_dist != 0)
         return df
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return pd.DataFrame()
 
-# Load additional summary data
-@st.cache_data(ttl=300)
-def load_summary_stats():
+# Shared FROM/JOIN block for the aggregate queries below
+AGG_FROM = """
+        FROM fact_trips f
+        JOIN dim_location src ON f.source_location_id = src.location_id
+        JOIN dim_location dest ON f.destination_location_id = dest.location_id
+        JOIN dim_date d ON f.date_id = d.date_id
+"""
+
+# Build the WHERE clause from the sidebar filters; 'All' filters are omitted
+# so Postgres sees one query shape per combination of active filters
+def build_filters(start_date, end_date, route_type, source, dest):
+    clauses = ["d.full_date BETWEEN :start_date AND :end_date"]
+    params = {'start_date': start_date, 'end_date': end_date}
+    if route_type != 'All':
+        clauses.append("f.route_type = :route_type")
+        params['route_type'] = route_type
+    if source != 'All':
+        clauses.append("src.center_name = :source")
+        params['source'] = source
+    if dest != 'All':
+        clauses.append("dest.center_name = :dest")
+        params['dest'] = dest
+    return " AND ".join(clauses), params
+
+# Run one aggregate query with the current filters pushed down as WHERE clauses,
+# so Postgres returns pre-aggregated rows instead of the full fact table.
+# Failures propagate: st.cache_data does not store a raised exception, so a
+# transient error (e.g. a statement_timeout) is retried on the next rerun
+# instead of serving an empty result from cache for the whole TTL
+def run_agg_query(query_template, filters, extra_params=None):
+    where, params = build_filters(*filters)
+    if extra_params:
+        params.update(extra_params)
+    query = query_template.format(agg_from=AGG_FROM, where=where)
+    return pd.read_sql(text(query), engine, params=params)
+
+# Call one of the cached aggregate loaders, degrading to an empty frame that
+# still carries the expected columns so downstream set_index/column access
+# renders an empty widget instead of raising KeyError
+def fetch_or_empty(loader, *args, columns=()):
     try:
-        queries = {
-            'daily_stats': """
-                SELECT d.full_date, 
-                       COUNT(*) as trip_count,
-                       AVG(f.time_deviation) as avg_deviation,
-                       SUM(CASE WHEN f.is_cutoff THEN 1 ELSE 0 END) as cutoff_count,
-                       AVG(f.actual_distance_to_destination) as avg_distance
-                FROM fact_trips f
-                JOIN dim_date d ON f.date_id = d.date_id
-                GROUP BY d.full_date
-                ORDER BY d.full_date
-            """,
-            'route_performance': """
-                SELECT src.center_name as source, dest.center_name as destination,
-                       COUNT(*) as trip_count,
-                       AVG(f.time_deviation) as avg_deviation,
-                       AVG(f.actual_time) as avg_actual_time,
-                       AVG(f.osrm_time) as avg_predicted_time,
-                       SUM(CASE WHEN f.is_cutoff THEN 1 ELSE 0 END) as cutoff_violations
-                FROM fact_trips f
-                JOIN dim_location src ON f.source_location_id = src.location_id
-                JOIN dim_location dest ON f.destination_location_id = dest.location_id
-                GROUP BY src.center_name, dest.center_name
-                HAVING COUNT(*) > 10
-                ORDER BY trip_count DESC
-            """
-        }
-        
-        results = {}
-        for key, query in queries.items():
-            results[key] = pd.read_sql(query, engine)
-            
-        return results
+        return loader(*args)
     except Exception as e:
-        st.error(f"Error loading summary stats: {e}")
-        return {}
+        st.error(f"Error loading aggregates: {e}")
+        return pd.DataFrame(columns=list(columns))
+
+# Cheap bounds/options queries so the sidebar renders before any fact rows
+# load. Failures propagate so neither st.cache_data nor session_state ever
+# holds an error result; the next rerun simply retries
+@st.cache_data(ttl=300)
+def load_filter_options():
+    bounds = pd.read_sql("""
+        SELECT MIN(d.full_date) AS min_date,
+               MAX(d.full_date) AS max_date,
+               MAX(f.time_deviation) AS max_deviation
+        FROM fact_trips f
+        JOIN dim_date d ON f.date_id = d.date_id
+    """, engine)
+    route_types = pd.read_sql(
+        "SELECT DISTINCT route_type FROM fact_trips ORDER BY route_type", engine)
+    centers = pd.read_sql(
+        "SELECT DISTINCT center_name, type FROM dim_location ORDER BY center_name", engine)
+    return {
+        'min_date': pd.to_datetime(bounds['min_date'].iloc[0]).date(),
+        'max_date': pd.to_datetime(bounds['max_date'].iloc[0]).date(),
+        'max_deviation': float(bounds['max_deviation'].iloc[0]),
+        'route_types': route_types['route_type'].tolist(),
+        'sources': centers.loc[centers['type'] == 'Source', 'center_name'].tolist(),
+        'destinations': centers.loc[centers['type'] == 'Destination', 'center_name'].tolist(),
+    }
+
+# Per-route rollup: volume, deviation, cutoffs and efficiency in one pass.
+# The column tuple doubles as the fetch_or_empty fallback schema
+ROUTE_ROLLUP_COLUMNS = ('source', 'destination', 'route', 'trip_count',
+                        'avg_deviation', 'max_deviation', 'cutoff_count',
+                        'avg_efficiency')
+
+@st.cache_data(ttl=300, max_entries=64)
+def load_route_rollup(start_date, end_date, route_type, source, dest):
+    query = """
+        SELECT src.center_name AS source,
+               dest.center_name AS destination,
+               src.center_name || ' → ' || dest.center_name AS route,
+               COUNT(*) AS trip_count,
+               AVG(f.time_deviation) AS avg_deviation,
+               MAX(f.time_deviation) AS max_deviation,
+               COUNT(*) FILTER (WHERE f.is_cutoff) AS cutoff_count,
+               AVG(f.osrm_time / NULLIF(f.actual_time, 0)) AS avg_efficiency
+        {agg_from}
+        WHERE {where}
+        GROUP BY src.center_name, dest.center_name
+        ORDER BY trip_count DESC
+    """
+    return run_agg_query(query, (start_date, end_date, route_type, source, dest))
+
+# Routes whose individual trips exceed the deviation threshold
+@st.cache_data(ttl=300, max_entries=64)
+def load_problem_routes(start_date, end_date, route_type, source, dest, threshold):
+    query = """
+        SELECT src.center_name || ' → ' || dest.center_name AS route,
+               COUNT(*) AS violation_count,
+               AVG(f.time_deviation) AS avg_deviation,
+               MAX(f.time_deviation) AS max_deviation,
+               COUNT(*) FILTER (WHERE f.is_cutoff) AS cutoff_count
+        {agg_from}
+        WHERE {where} AND f.time_deviation > :threshold
+        GROUP BY src.center_name, dest.center_name
+        ORDER BY violation_count DESC
+        LIMIT 10
+    """
+    return run_agg_query(query, (start_date, end_date, route_type, source, dest),
+                         {'threshold': threshold})
+
+# Day-of-week rollup for the trends tab
+@st.cache_data(ttl=300, max_entries=64)
+def load_dow_rollup(start_date, end_date, route_type, source, dest):
+    query = """
+        SELECT d.day_of_week,
+               COUNT(*) AS trip_count,
+               AVG(f.time_deviation) AS avg_deviation,
+               COUNT(*) FILTER (WHERE f.is_cutoff) AS cutoff_count
+        {agg_from}
+        WHERE {where}
+        GROUP BY d.day_of_week
+    """
+    return run_agg_query(query, (start_date, end_date, route_type, source, dest))
+
+# Vehicle-type rollup for the operations tab
+@st.cache_data(ttl=300, max_entries=64)
+def load_vehicle_rollup(start_date, end_date, route_type, source, dest):
+    query = """
+        SELECT v.vehicle_type,
+               COUNT(*) AS trip_count,
+               AVG(f.time_deviation) AS avg_deviation,
+               AVG(f.actual_distance_to_destination) AS avg_distance
+        {agg_from}
+        JOIN dim_vehicles v ON f.vehicle_id = v.vehicle_id
+        WHERE {where}
+        GROUP BY v.vehicle_type
+    """
+    return run_agg_query(query, (start_date, end_date, route_type, source, dest))
+
+# M4 downsampling: wrap a (ts, val) series query so each of `width` time
+# buckets keeps only its first, last, min and max rows. The client then
+# receives at most ~4 * width points no matter how long the history grows,
+# while the rendered line is pixel-identical to the full series
+def m4_downsample_sql(inner_sql, width=1000):
+    return """
+        WITH series AS ({inner}),
+        bounds AS (
+            SELECT extract(epoch FROM MIN(ts)) AS lo,
+                   extract(epoch FROM MAX(ts)) + 1 AS hi
+            FROM series
+        ),
+        bucketed AS (
+            SELECT s.ts, s.val,
+                   width_bucket(extract(epoch FROM s.ts), b.lo, b.hi, {width}) AS bucket
+            FROM series s CROSS JOIN bounds b
+        )
+        SELECT ts, val FROM (
+            SELECT ts, val,
+                   row_number() OVER (PARTITION BY bucket ORDER BY val) AS rmin,
+                   row_number() OVER (PARTITION BY bucket ORDER BY val DESC) AS rmax,
+                   row_number() OVER (PARTITION BY bucket ORDER BY ts) AS rfirst,
+                   row_number() OVER (PARTITION BY bucket ORDER BY ts DESC) AS rlast
+            FROM bucketed
+        ) t
+        WHERE rmin = 1 OR rmax = 1 OR rfirst = 1 OR rlast = 1
+        ORDER BY ts
+    """.format(inner=inner_sql, width=int(width))
+
+# Daily metrics the trends tab can plot; the SQL expression lives here so the
+# metric name stays a plain dict key rather than interpolated user input
+DAILY_METRICS = {
+    'trip_count': 'COUNT(*)',
+    'avg_deviation': 'AVG(f.time_deviation)',
+    'cutoff_count': 'COUNT(*) FILTER (WHERE f.is_cutoff)',
+    'avg_distance': 'AVG(f.actual_distance_to_destination)',
+}
+
+# All daily time series, aggregated and M4-downsampled server-side. The four
+# queries are independent, so they run concurrently on separate pooled
+# connections and cold-cache latency collapses to the slowest one instead of
+# the sum of all four
+@st.cache_data(ttl=300, max_entries=64)
+def load_daily_series_bundle(start_date, end_date, route_type, source, dest, width=1000):
+    where, params = build_filters(start_date, end_date, route_type, source, dest)
+
+    def run_one(metric):
+        inner = "SELECT d.full_date AS ts, {metric} AS val {agg_from} WHERE {where} GROUP BY d.full_date".format(
+            metric=DAILY_METRICS[metric], agg_from=AGG_FROM, where=where)
+        return pd.read_sql(text(m4_downsample_sql(inner, width)), engine, params=params)
+
+    with ThreadPoolExecutor(max_workers=len(DAILY_METRICS)) as pool:
+        futures = {metric: pool.submit(run_one, metric) for metric in DAILY_METRICS}
+        return {metric: future.result() for metric, future in futures.items()}
+
+# Daily mean deviation for a single route, M4-downsampled server-side
+@st.cache_data(ttl=300, max_entries=64)
+def load_route_trend(start_date, end_date, route_type, source, dest, route, width=1000):
+    where, params = build_filters(start_date, end_date, route_type, source, dest)
+    params['route'] = route
+    inner = ("SELECT d.full_date AS ts, AVG(f.time_deviation) AS val {agg_from} "
+             "WHERE {where} AND src.center_name || ' → ' || dest.center_name = :route "
+             "GROUP BY d.full_date").format(agg_from=AGG_FROM, where=where)
+    return pd.read_sql(text(m4_downsample_sql(inner, width)), engine, params=params)
+
+# Deviation histogram binned server-side with width_bucket, so only
+# bin counts cross the wire instead of one value per trip
+@st.cache_data(ttl=300, max_entries=64)
+def load_deviation_histogram(start_date, end_date, route_type, source, dest, bins=50):
+    where, params = build_filters(start_date, end_date, route_type, source, dest)
+    params['bins'] = bins
+    query = """
+            WITH bounds AS (
+                SELECT MIN(f.time_deviation) AS lo,
+                       MAX(f.time_deviation) + 0.001 AS hi
+                {agg_from}
+                WHERE {where}
+            )
+            SELECT b.lo + (t.bucket - 1) * (b.hi - b.lo) / :bins AS bin_start,
+                   t.freq
+            FROM (
+                SELECT width_bucket(f.time_deviation, b.lo, b.hi, :bins) AS bucket,
+                       COUNT(*) AS freq
+                {agg_from}
+                CROSS JOIN bounds b
+                WHERE {where}
+                GROUP BY 1
+            ) t
+            CROSS JOIN bounds b
+            ORDER BY t.bucket
+        """.format(agg_from=AGG_FROM, where=where)
+    return pd.read_sql(text(query), engine, params=params)
+
+# Single-route drill-down for the deep dive tab
+@st.cache_data(ttl=300, max_entries=64)
+def load_route_trips(start_date, end_date, route_type, source, dest, route):
+    query = """
+        SELECT f.trip_uuid,
+               d.full_date,
+               f.actual_time,
+               f.osrm_time,
+               f.time_deviation,
+               f.actual_distance_to_destination,
+               f.is_cutoff
+        {agg_from}
+        WHERE {where} AND src.center_name || ' → ' || dest.center_name = :route
+    """
+    df = run_agg_query(query, (start_date, end_date, route_type, source, dest),
+                       {'route': route})
+    if not df.empty:
+        df['full_date'] = pd.to_datetime(df['full_date'])
+    return df
+
+# Rollups still computed in pandas from the filtered frame. The leading
+# underscore keeps Streamlit's hasher off the DataFrame itself; the filter
+# tuple is the cache key, so widget toggles that leave the filters unchanged
+# reuse the memoized result
+@st.cache_data(ttl=300, max_entries=64)
+def route_type_distribution(filter_key, _filtered_df):
+    # np.bincount over the category codes instead of value_counts' hash path
+    categories = _filtered_df['route_type'].cat.categories
+    codes = _filtered_df['route_type'].cat.codes.to_numpy()
+    counts = np.bincount(codes[codes >= 0], minlength=len(categories))
+    return pd.Series(counts, index=categories).sort_values(ascending=False)
+
+@st.cache_data(ttl=300, max_entries=64)
+def weekend_rollup(filter_key, _filtered_df):
+    # Weighted bincounts: one vectorized pass per metric on the raw arrays
+    # instead of a hashed two-group groupby
+    grp = _filtered_df['is_weekend'].to_numpy().astype(np.int64)
+    count = np.bincount(grp, minlength=2)
+    denom = np.maximum(count, 1)
+    avg_deviation = np.bincount(
+        grp, weights=_filtered_df['time_deviation'].to_numpy(), minlength=2) / denom
+    avg_actual = np.bincount(
+        grp, weights=_filtered_df['actual_time'].to_numpy(), minlength=2) / denom
+    cutoffs = np.bincount(
+        grp, weights=_filtered_df['is_cutoff'].to_numpy(), minlength=2)
+    return pd.DataFrame({
+        'trip_uuid': count,
+        'time_deviation': avg_deviation,
+        'actual_time': avg_actual,
+        'is_cutoff': cutoffs.astype(np.int64)
+    }, index=['Weekday', 'Weekend']).round(2)
+
+# Scatter sample pinned by random_state so it is stable across reruns (no
+# visual jitter) and memoized per filter tuple instead of re-drawn per click
+@st.cache_data(ttl=300, max_entries=16)
+def sample_for_plot(filter_key, n, _filtered_df):
+    if len(_filtered_df) > n:
+        return _filtered_df.sample(n=n, random_state=0)
+    return _filtered_df
+
+@st.cache_data(ttl=300, max_entries=64)
+def numeric_summary(filter_key, _filtered_df):
+    numeric_cols = ['actual_time', 'osrm_time', 'time_deviation', 'actual_distance_to_destination', 'osrm_distance']
+    return _filtered_df[numeric_cols].describe().round(2)
 
 # Main app
 def main():
     # Header
     st.markdown('<h1 class="main-header">🚚 Delhivery Logistics Intelligence Dashboard</h1>', unsafe_allow_html=True)
-    
-    # Load data
-    with st.spinner("Loading data..."):
-        df = load_data()
-        summary_stats = load_summary_stats()
-    
-    if df.empty:
+
+    # Sidebar options come from cheap dimension queries, so the widgets
+    # render without touching the fact table. They are stable for a session,
+    # so session_state keeps reruns from repeating even the cache lookup
+    if 'widget_options' not in st.session_state:
+        # Persist only a successful fetch: storing an error result here
+        # would outlive the cache TTL and brick the session until restart
+        try:
+            st.session_state['widget_options'] = load_filter_options()
+        except Exception as e:
+            st.error(f"Error loading filter options: {e}")
+    options = st.session_state.get('widget_options', {})
+
+    if not options:
         st.error("No data available. Please check your database connection.")
         return
-    
+
     # Sidebar filters
     st.sidebar.markdown(
     '<div class="sidebar-header" style="color: white;">📊 Filters & Controls</div>',
@@ -145,335 +497,333 @@ def main():
 )
 
     # Date range filter
-    min_date = df['full_date'].min().date()
-    max_date = df['full_date'].max().date()
-    
+    min_date = options['min_date']
+    max_date = options['max_date']
+
     date_range = st.sidebar.date_input(
         "Select Date Range",
         value=(min_date, max_date),
         min_value=min_date,
         max_value=max_date
     )
-    
+
     # Route type filter
-    route_types = ['All'] + sorted(df['route_type'].unique().tolist())
+    route_types = ['All'] + options['route_types']
     selected_route_type = st.sidebar.selectbox("Route Type", route_types)
-    
+
     # Source/Destination filters
-    sources = ['All'] + sorted(df['source_name'].unique().tolist())
-    destinations = ['All'] + sorted(df['dest_name'].unique().tolist())
-    
+    sources = ['All'] + options['sources']
+    destinations = ['All'] + options['destinations']
+
     selected_source = st.sidebar.selectbox("Source Center", sources)
     selected_destination = st.sidebar.selectbox("Destination Center", destinations)
-    
+
     # Performance threshold
-    deviation_threshold = st.sidebar.slider("Time Deviation Threshold (minutes)", 
-                                          min_value=0, max_value=int(df['time_deviation'].max()), 
+    deviation_threshold = st.sidebar.slider("Time Deviation Threshold (minutes)",
+                                          min_value=0, max_value=int(options['max_deviation']),
                                           value=30)
-    
-    # Apply filters
-    filtered_df = df.copy()
-    
+
     if len(date_range) == 2:
         start_date, end_date = date_range
-        filtered_df = filtered_df[
-            (filtered_df['full_date'].dt.date >= start_date) & 
-            (filtered_df['full_date'].dt.date <= end_date)
-        ]
-    
-    if selected_route_type != 'All':
-        filtered_df = filtered_df[filtered_df['route_type'] == selected_route_type]
-    
-    if selected_source != 'All':
-        filtered_df = filtered_df[filtered_df['source_name'] == selected_source]
-        
-    if selected_destination != 'All':
-        filtered_df = filtered_df[filtered_df['dest_name'] == selected_destination]
-    
+    else:
+        start_date, end_date = min_date, max_date
+
+    # Cache key shared by load_data and all the SQL-side aggregate loaders
+    filter_key = (start_date, end_date, selected_route_type,
+                  selected_source, selected_destination)
+
+    # Load only the selected slice; the filters are applied in the query
+    with st.spinner("Loading data..."):
+        filtered_df = load_data(*filter_key)
+
+    if filtered_df.empty:
+        st.error("No data available for the selected filters.")
+        return
+
     # Key Performance Indicators
     st.markdown("## 📈 Key Performance Indicators")
-    
+
     if len(filtered_df) > 0:
         col1, col2, col3, col4, col5 = st.columns(5)
-        
+
         # Calculate KPIs
         total_trips = len(filtered_df)
-        on_time_pct = 100 * len(filtered_df[filtered_df["is_cutoff"] == 0]) / total_trips if total_trips > 0 else 0
+        is_cutoff_arr = filtered_df['is_cutoff'].to_numpy()
+        on_time_pct = 100 * np.count_nonzero(is_cutoff_arr == 0) / total_trips if total_trips > 0 else 0
         avg_deviation = filtered_df["time_deviation"].mean()
-        cutoff_count = filtered_df["is_cutoff"].sum()
+        cutoff_count = np.count_nonzero(is_cutoff_arr)
         avg_efficiency = filtered_df['efficiency_ratio'].mean() * 100 if filtered_df['efficiency_ratio'].notna().any() else 0
-        
+
         with col1:
-            st.metric("✅ On-Time Delivery", f"{on_time_pct:.1f}%", 
+            st.metric("✅ On-Time Delivery", f"{on_time_pct:.1f}%",
                      delta=f"{on_time_pct-95:.1f}%" if on_time_pct < 95 else f"+{on_time_pct-95:.1f}%")
-        
+
         with col2:
             st.metric("📦 Total Trips", f"{total_trips:,}")
-        
+
         with col3:
-            st.metric("⚠️ Cutoff Violations", f"{cutoff_count:,}", 
+            st.metric("⚠️ Cutoff Violations", f"{cutoff_count:,}",
                      delta=f"{cutoff_count}" if cutoff_count > 0 else "0")
-        
+
         with col4:
-            st.metric("⏱️ Avg Time Deviation", f"{avg_deviation:.1f} min", 
+            st.metric("⏱️ Avg Time Deviation", f"{avg_deviation:.1f} min",
                      delta=f"{avg_deviation:.1f} min" if avg_deviation > 0 else f"{avg_deviation:.1f} min")
-        
+
         with col5:
             st.metric("🎯 Route Efficiency", f"{avg_efficiency:.1f}%",
                      delta=f"{avg_efficiency-100:.1f}%" if avg_efficiency != 0 else "N/A")
-    
+
     st.markdown("---")
-    
+
     # Main dashboard tabs
     tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
-        "📊 Overview", "🗺️ Route Analysis", "📈 Performance Trends", 
+        "📊 Overview", "🗺️ Route Analysis", "📈 Performance Trends",
         "🚛 Operations", "📋 Data Quality", "🔍 Deep Dive"
     ])
-    
+
     with tab1:
         # Overview tab
         col1, col2 = st.columns(2)
-        
+
         with col1:
-            # Time deviation distribution
-            fig_hist = px.histogram(
-                filtered_df, 
-                x='time_deviation', 
-                nbins=50,
-                title="Distribution of Time Deviations",
-                labels={'time_deviation': 'Time Deviation (minutes)', 'count': 'Frequency'},
-                color_discrete_sequence=['#636EFA']
-            )
-            fig_hist.add_vline(x=deviation_threshold, line_dash="dash", line_color="red", 
-                              annotation_text=f"Threshold: {deviation_threshold} min")
-            st.plotly_chart(fig_hist, use_container_width=True)
-        
+            # Time deviation distribution, binned server-side
+            hist_df = fetch_or_empty(load_deviation_histogram, *filter_key,
+                                     columns=('bin_start', 'freq'))
+            if not hist_df.empty:
+                # Pre-binned counts go straight into a Bar trace: O(bins)
+                # SVG nodes instead of one node per trip
+                fig_hist = go.Figure(go.Bar(
+                    x=hist_df['bin_start'],
+                    y=hist_df['freq'],
+                    marker_color='#636EFA'
+                ))
+                fig_hist.update_layout(
+                    title="Distribution of Time Deviations",
+                    xaxis_title="Time Deviation (minutes)",
+                    yaxis_title="Frequency"
+                )
+                fig_hist.add_vline(x=deviation_threshold, line_dash="dash", line_color="red",
+                                  annotation_text=f"Threshold: {deviation_threshold} min")
+                st.plotly_chart(fig_hist, use_container_width=True)
+
         with col2:
             # Route type distribution
-            route_dist = filtered_df['route_type'].value_counts()
+            route_dist = route_type_distribution(filter_key, filtered_df)
             fig_pie = px.pie(
-                values=route_dist.values, 
+                values=route_dist.values,
                 names=route_dist.index,
                 title="Distribution by Route Type",
                 color_discrete_sequence=px.colors.qualitative.Set3
             )
             st.plotly_chart(fig_pie, use_container_width=True)
-        
+
         # Top problematic routes
         st.subheader("🚨 Routes Exceeding Deviation Threshold")
-        problematic_routes = filtered_df[filtered_df['time_deviation'] > deviation_threshold]
-        if not problematic_routes.empty:
-            problem_summary = problematic_routes.groupby('route').agg({
-                'time_deviation': ['count', 'mean', 'max'],
-                'is_cutoff': 'sum'
-            }).round(2)
+        problem_summary = fetch_or_empty(
+            load_problem_routes, *filter_key, deviation_threshold,
+            columns=('route', 'violation_count', 'avg_deviation',
+                     'max_deviation', 'cutoff_count'))
+        if not problem_summary.empty:
+            problem_summary = problem_summary.set_index('route').round(2)
             problem_summary.columns = ['Violation Count', 'Avg Deviation', 'Max Deviation', 'Cutoff Count']
-            problem_summary = problem_summary.sort_values('Violation Count', ascending=False).head(10)
             st.dataframe(problem_summary, use_container_width=True)
         else:
             st.success("No routes exceed the current deviation threshold! 🎉")
-    
+
     with tab2:
         # Route Analysis tab
         st.subheader("🗺️ Route Performance Analysis")
-        
+
+        route_rollup = fetch_or_empty(load_route_rollup, *filter_key,
+                                      columns=ROUTE_ROLLUP_COLUMNS)
+
         # Route performance heatmap
-        if 'route_performance' in summary_stats and not summary_stats['route_performance'].empty:
-            route_perf = summary_stats['route_performance'].head(20)
-            
-            # Create a pivot table for heatmap
-            heatmap_data = route_perf.pivot_table(
-                index='source', 
-                columns='destination', 
-                values='avg_deviation', 
-                fill_value=0
-            )
-            
+        if not route_rollup.empty:
+            route_perf = route_rollup.head(20)
+
+            # 20 rows don't need pivot_table: scatter the values into a small
+            # FP32 matrix addressed by integer codes
+            src_codes, src_labels = pd.factorize(route_perf['source'])
+            dst_codes, dst_labels = pd.factorize(route_perf['destination'])
+            heatmap_data = np.zeros((len(src_labels), len(dst_labels)), dtype=np.float32)
+            heatmap_data[src_codes, dst_codes] = route_perf['avg_deviation'].to_numpy()
+
             fig_heatmap = px.imshow(
                 heatmap_data,
+                x=dst_labels.tolist(),
+                y=src_labels.tolist(),
                 title="Route Performance Heatmap (Average Time Deviation)",
                 labels=dict(x="Destination", y="Source", color="Avg Deviation (min)"),
                 aspect="auto",
                 color_continuous_scale="RdYlBu_r"
             )
             st.plotly_chart(fig_heatmap, use_container_width=True)
-        
+
         col1, col2 = st.columns(2)
-        
+
         with col1:
             # Top routes by volume
-            top_routes = filtered_df.groupby('route').agg({
-                'trip_uuid': 'count',
-                'time_deviation': 'mean',
-                'is_cutoff': 'sum'
-            }).round(2)
-            top_routes.columns = ['Trip Count', 'Avg Deviation', 'Cutoff Count']
-            top_routes = top_routes.sort_values('Trip Count', ascending=False).head(10)
-            
+            top_routes = route_rollup.head(10)
+
             fig_routes = px.bar(
-                x=top_routes.index,
-                y=top_routes['Trip Count'],
+                x=top_routes['route'],
+                y=top_routes['trip_count'],
                 title="Top 10 Routes by Volume",
                 labels={'x': 'Route', 'y': 'Trip Count'}
             )
             fig_routes.update_xaxes(tickangle=45)
             st.plotly_chart(fig_routes, use_container_width=True)
-        
+
         with col2:
             # Efficiency scatter plot
-            route_efficiency = filtered_df.groupby('route').agg({
-                'efficiency_ratio': 'mean',
-                'trip_uuid': 'count',
-                'time_deviation': 'mean'
-            }).reset_index()
-            route_efficiency = route_efficiency[route_efficiency['trip_uuid'] >= 5]  # Filter routes with at least 5 trips
-            
+            route_efficiency = route_rollup[route_rollup['trip_count'] >= 5]  # Filter routes with at least 5 trips
+
             fig_scatter = px.scatter(
                 route_efficiency,
-                x='efficiency_ratio',
-                y='time_deviation',
-                size='trip_uuid',
+                x='avg_efficiency',
+                y='avg_deviation',
+                size='trip_count',
                 hover_data=['route'],
                 title="Route Efficiency vs Time Deviation",
                 labels={
-                    'efficiency_ratio': 'Efficiency Ratio',
-                    'time_deviation': 'Avg Time Deviation (min)',
-                    'trip_uuid': 'Trip Count'
-                }
+                    'avg_efficiency': 'Efficiency Ratio',
+                    'avg_deviation': 'Avg Time Deviation (min)',
+                    'trip_count': 'Trip Count'
+                },
+                render_mode='webgl'
             )
             st.plotly_chart(fig_scatter, use_container_width=True)
-    
+
     with tab3:
         # Performance Trends tab
         st.subheader("📈 Performance Trends Over Time")
-        
-        if 'daily_stats' in summary_stats and not summary_stats['daily_stats'].empty:
-            daily_stats = summary_stats['daily_stats']
-            daily_stats['full_date'] = pd.to_datetime(daily_stats['full_date'])
-            
+
+        # Each series arrives pre-aggregated and M4-downsampled from Postgres
+        try:
+            daily_series = load_daily_series_bundle(*filter_key)
+        except Exception as e:
+            st.error(f"Error loading daily series: {e}")
+            daily_series = {}
+
+        if daily_series and any(not s.empty for s in daily_series.values()):
             # Multi-metric time series
             fig_trends = make_subplots(
                 rows=2, cols=2,
-                subplot_titles=('Daily Trip Volume', 'Average Time Deviation', 
+                subplot_titles=('Daily Trip Volume', 'Average Time Deviation',
                                'Cutoff Violations', 'Average Distance'),
                 specs=[[{"secondary_y": False}, {"secondary_y": False}],
                        [{"secondary_y": False}, {"secondary_y": False}]]
             )
-            
+
             # Trip volume
             fig_trends.add_trace(
-                go.Scatter(x=daily_stats['full_date'], y=daily_stats['trip_count'],
+                go.Scatter(x=daily_series['trip_count']['ts'], y=daily_series['trip_count']['val'],
                           name='Trip Count', line=dict(color='blue')),
                 row=1, col=1
             )
-            
+
             # Time deviation
             fig_trends.add_trace(
-                go.Scatter(x=daily_stats['full_date'], y=daily_stats['avg_deviation'],
+                go.Scatter(x=daily_series['avg_deviation']['ts'], y=daily_series['avg_deviation']['val'],
                           name='Avg Deviation', line=dict(color='red')),
                 row=1, col=2
             )
-            
+
             # Cutoff violations
             fig_trends.add_trace(
-                go.Scatter(x=daily_stats['full_date'], y=daily_stats['cutoff_count'],
+                go.Scatter(x=daily_series['cutoff_count']['ts'], y=daily_series['cutoff_count']['val'],
                           name='Cutoff Count', line=dict(color='orange')),
                 row=2, col=1
             )
-            
+
             # Average distance
             fig_trends.add_trace(
-                go.Scatter(x=daily_stats['full_date'], y=daily_stats['avg_distance'],
+                go.Scatter(x=daily_series['avg_distance']['ts'], y=daily_series['avg_distance']['val'],
                           name='Avg Distance', line=dict(color='green')),
                 row=2, col=2
             )
-            
-            fig_trends.update_layout(height=600, showlegend=False, 
+
+            fig_trends.update_layout(height=600, showlegend=False,
                                    title_text="Performance Trends Dashboard")
             st.plotly_chart(fig_trends, use_container_width=True)
-        
+
         # Day of week analysis
         col1, col2 = st.columns(2)
-        
+
         with col1:
-            dow_analysis = filtered_df.groupby('day_of_week').agg({
-                'trip_uuid': 'count',
-                'time_deviation': 'mean',
-                'is_cutoff': 'sum'
-            }).round(2)
-            dow_analysis.columns = ['Trip Count', 'Avg Deviation', 'Cutoff Count']
-            
+            dow_analysis = fetch_or_empty(
+                load_dow_rollup, *filter_key,
+                columns=('day_of_week', 'trip_count', 'avg_deviation',
+                         'cutoff_count')).set_index('day_of_week')
+
             # Reorder days
             day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
             dow_analysis = dow_analysis.reindex([day for day in day_order if day in dow_analysis.index])
-            
+
             fig_dow = px.bar(
                 x=dow_analysis.index,
-                y=dow_analysis['Trip Count'],
+                y=dow_analysis['trip_count'],
                 title="Trip Volume by Day of Week",
-                color=dow_analysis['Avg Deviation'],
+                color=dow_analysis['avg_deviation'],
                 color_continuous_scale="RdYlBu_r"
             )
             st.plotly_chart(fig_dow, use_container_width=True)
-        
+
         with col2:
             # Weekend vs Weekday comparison
-            weekend_comparison = filtered_df.groupby('is_weekend').agg({
-                'trip_uuid': 'count',
-                'time_deviation': 'mean',
-                'actual_time': 'mean',
-                'is_cutoff': 'sum'
-            }).round(2)
-            weekend_comparison.index = ['Weekday', 'Weekend']
-            
+            weekend_comparison = weekend_rollup(filter_key, filtered_df)
+
             st.subheader("Weekend vs Weekday Performance")
             st.dataframe(weekend_comparison)
-    
+
     with tab4:
         # Operations tab
         st.subheader("🚛 Operational Insights")
-        
+
         col1, col2 = st.columns(2)
-        
+
         with col1:
             # Vehicle type analysis
-            vehicle_analysis = filtered_df.groupby('vehicle_type').agg({
-                'trip_uuid': 'count',
-                'time_deviation': 'mean',
-                'actual_distance_to_destination': 'mean'
-            }).round(2)
+            vehicle_analysis = fetch_or_empty(
+                load_vehicle_rollup, *filter_key,
+                columns=('vehicle_type', 'trip_count', 'avg_deviation',
+                         'avg_distance')).set_index('vehicle_type').round(2)
             vehicle_analysis.columns = ['Trip Count', 'Avg Deviation', 'Avg Distance']
-            
+
             st.subheader("Performance by Vehicle Type")
             st.dataframe(vehicle_analysis)
-        
+
         with col2:
-            # Segment factor analysis
+            # Segment factor analysis; WebGL handles 100k+ points, so only
+            # sample beyond that as a fallback
+            segment_df = sample_for_plot(filter_key, 100_000, filtered_df)
             fig_segment = px.scatter(
-                filtered_df.sample(min(1000, len(filtered_df))),  # Sample for performance
+                segment_df,
                 x='segment_factor',
                 y='time_deviation',
                 color='route_type',
                 title="Segment Factor vs Time Deviation",
-                opacity=0.6
+                opacity=0.6,
+                render_mode='webgl'
             )
             st.plotly_chart(fig_segment, use_container_width=True)
-        
+
         # Operational alerts
         st.subheader("🚨 Operational Alerts")
-        
+
         alerts = []
-        
+        route_rollup = fetch_or_empty(load_route_rollup, *filter_key,
+                                      columns=ROUTE_ROLLUP_COLUMNS)
+
         # High deviation routes
-        high_dev_routes = filtered_df.groupby('route')['time_deviation'].mean()
-        critical_routes = high_dev_routes[high_dev_routes > deviation_threshold * 2].head(5)
+        critical_routes = route_rollup[route_rollup['avg_deviation'] > deviation_threshold * 2].head(5)
         if not critical_routes.empty:
             alerts.append({
                 'Type': 'Critical Delay',
                 'Description': f"{len(critical_routes)} routes with extremely high deviations",
                 'Action': 'Immediate investigation required'
             })
-        
+
         # High cutoff rate
         cutoff_rate = (filtered_df['is_cutoff'].sum() / len(filtered_df)) * 100 if len(filtered_df) > 0 else 0
         if cutoff_rate > 10:
@@ -482,182 +832,214 @@ def main():
                 'Description': f"Cutoff rate is {cutoff_rate:.1f}% (above 10% threshold)",
                 'Action': 'Review capacity planning'
             })
-        
+
         # Low efficiency routes
-        low_eff_routes = filtered_df.groupby('route')['efficiency_ratio'].mean()
-        inefficient_routes = low_eff_routes[low_eff_routes < 0.7].head(3)
+        inefficient_routes = route_rollup[route_rollup['avg_efficiency'] < 0.7].head(3)
         if not inefficient_routes.empty:
             alerts.append({
                 'Type': 'Low Efficiency',
                 'Description': f"{len(inefficient_routes)} routes operating below 70% efficiency",
                 'Action': 'Route optimization needed'
             })
-        
+
         if alerts:
             alerts_df = pd.DataFrame(alerts)
             st.dataframe(alerts_df, use_container_width=True)
         else:
             st.success("No critical alerts at this time! 🎉")
-    
+
     with tab5:
         # Data Quality tab
         st.subheader("📋 Data Quality Assessment")
-        
+
         col1, col2 = st.columns(2)
-        
+
         with col1:
-            # Missing values analysis
-            missing_data = filtered_df.isnull().sum()
-            missing_pct = (missing_data / len(filtered_df)) * 100
-            
+            # Missing values analysis: count nulls column by column on the raw
+            # arrays, never materializing the frame-wide boolean matrix that
+            # isnull().sum() would allocate
+            nulls = {col: int(filtered_df[col].isna().to_numpy().sum())
+                     for col in filtered_df.columns}
+            n_rows = len(filtered_df)
+
             quality_df = pd.DataFrame({
-                'Column': missing_data.index,
-                'Missing Count': missing_data.values,
-                'Missing %': missing_pct.values
+                'Column': list(nulls.keys()),
+                'Missing Count': list(nulls.values()),
+                'Missing %': [100 * count / n_rows for count in nulls.values()]
             })
             quality_df = quality_df[quality_df['Missing Count'] > 0].sort_values('Missing %', ascending=False)
-            
+
             if not quality_df.empty:
                 st.subheader("Missing Data Analysis")
                 st.dataframe(quality_df)
             else:
                 st.success("No missing data detected! ✅")
-        
+
         with col2:
             # Data anomalies
             st.subheader("Data Anomalies Detected")
-            
+
             anomalies = []
-            
-            # Negative time deviations (very unusual)
-            neg_deviations = len(filtered_df[filtered_df['time_deviation'] < -60])  # More than 1 hour early
+
+            if anomaly_counts is not None:
+                # One fused JIT-compiled pass over all four predicates
+                neg_deviations, extreme_deviations, zero_distances, same_location = anomaly_counts(
+                    filtered_df['time_deviation'].to_numpy(),
+                    filtered_df['actual_distance_to_destination'].to_numpy(),
+                    filtered_df['source_name'].to_numpy() == filtered_df['dest_name'].to_numpy()
+                )
+            else:
+                # Grab each array once and count with np.count_nonzero instead
+                # of materializing four filtered frames
+                td = filtered_df['time_deviation'].to_numpy()
+                dist = filtered_df['actual_distance_to_destination'].to_numpy()
+
+                # Align the two category sets so the source == destination
+                # check is an integer-code compare, not a string compare
+                common = filtered_df['source_name'].cat.categories.union(
+                    filtered_df['dest_name'].cat.categories)
+                src_codes = filtered_df['source_name'].cat.set_categories(common).cat.codes.to_numpy()
+                dst_codes = filtered_df['dest_name'].cat.set_categories(common).cat.codes.to_numpy()
+
+                neg_deviations = int(np.count_nonzero(td < -60))      # more than 1 hour early
+                extreme_deviations = int(np.count_nonzero(td > 300))  # more than 5 hours late
+                zero_distances = int(np.count_nonzero(dist == 0))
+                same_location = int(np.count_nonzero(src_codes == dst_codes))
+
             if neg_deviations > 0:
                 anomalies.append(f"{neg_deviations} trips arrived >1 hour early")
-            
-            # Extreme deviations
-            extreme_deviations = len(filtered_df[filtered_df['time_deviation'] > 300])  # More than 5 hours late
+
             if extreme_deviations > 0:
                 anomalies.append(f"{extreme_deviations} trips with >5 hour delays")
-            
-            # Zero distances
-            zero_distances = len(filtered_df[filtered_df['actual_distance_to_destination'] == 0])
+
             if zero_distances > 0:
                 anomalies.append(f"{zero_distances} trips with zero distance")
-            
-            # Same source and destination
-            same_location = len(filtered_df[filtered_df['source_name'] == filtered_df['dest_name']])
+
             if same_location > 0:
                 anomalies.append(f"{same_location} trips with same source and destination")
-            
+
             if anomalies:
                 for anomaly in anomalies:
                     st.warning(f"⚠️ {anomaly}")
             else:
                 st.success("No significant anomalies detected! ✅")
-        
+
         # Statistical summary
         st.subheader("Statistical Summary")
-        numeric_cols = ['actual_time', 'osrm_time', 'time_deviation', 'actual_distance_to_destination', 'osrm_distance']
-        summary_stats_df = filtered_df[numeric_cols].describe().round(2)
+        summary_stats_df = numeric_summary(filter_key, filtered_df)
         st.dataframe(summary_stats_df)
-    
+
     with tab6:
         # Deep Dive tab
         st.subheader("🔍 Deep Dive Analysis")
-        
+
         # Interactive route explorer
         st.subheader("Route Explorer")
-        
+
+        route_options = fetch_or_empty(load_route_rollup, *filter_key,
+                                       columns=ROUTE_ROLLUP_COLUMNS)['route'].tolist()
         selected_route_detailed = st.selectbox(
             "Select a route for detailed analysis:",
-            options=[''] + sorted(filtered_df['route'].unique().tolist()),
+            options=[''] + sorted(route_options),
             key="route_explorer"
         )
-        
+
         if selected_route_detailed:
-            route_data = filtered_df[filtered_df['route'] == selected_route_detailed]
-            
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.metric("Total Trips", len(route_data))
-                st.metric("Avg Deviation", f"{route_data['time_deviation'].mean():.1f} min")
-            
-            with col2:
-                st.metric("Success Rate", f"{((len(route_data) - route_data['is_cutoff'].sum()) / len(route_data) * 100):.1f}%")
-                st.metric("Avg Distance", f"{route_data['actual_distance_to_destination'].mean():.1f} km")
-            
-            with col3:
-                st.metric("Best Performance", f"{route_data['time_deviation'].min():.1f} min")
-                st.metric("Worst Performance", f"{route_data['time_deviation'].max():.1f} min")
-            
-            # Time series for selected route
-            route_daily = route_data.groupby(route_data['full_date'].dt.date).agg({
-                'time_deviation': 'mean',
-                'trip_uuid': 'count'
-            }).reset_index()
-            
-            fig_route_trend = px.line(
-                route_daily,
-                x='full_date',
-                y='time_deviation',
-                title=f"Time Deviation Trend for {selected_route_detailed}",
-                hover_data=['trip_uuid']
-            )
-            st.plotly_chart(fig_route_trend, use_container_width=True)
-            
-            # Recent trips table
-            st.subheader("Recent Trips")
-            recent_trips = route_data.nlargest(10, 'full_date')[
-                ['full_date', 'actual_time', 'osrm_time', 'time_deviation', 'is_cutoff']
-            ]
-            st.dataframe(recent_trips, use_container_width=True)
-        
+            # Query only the selected route instead of slicing the full frame
+            route_data = fetch_or_empty(
+                load_route_trips, *filter_key, selected_route_detailed,
+                columns=('trip_uuid', 'full_date', 'actual_time', 'osrm_time',
+                         'time_deviation', 'actual_distance_to_destination',
+                         'is_cutoff'))
+
+            if route_data.empty:
+                st.info("No trips found for this route with the current filters.")
+            else:
+                col1, col2, col3 = st.columns(3)
+
+                with col1:
+                    st.metric("Total Trips", len(route_data))
+                    st.metric("Avg Deviation", f"{route_data['time_deviation'].mean():.1f} min")
+
+                with col2:
+                    st.metric("Success Rate", f"{((len(route_data) - route_data['is_cutoff'].sum()) / len(route_data) * 100):.1f}%")
+                    st.metric("Avg Distance", f"{route_data['actual_distance_to_destination'].mean():.1f} km")
+
+                with col3:
+                    st.metric("Best Performance", f"{route_data['time_deviation'].min():.1f} min")
+                    st.metric("Worst Performance", f"{route_data['time_deviation'].max():.1f} min")
+
+                # Time series for selected route, M4-downsampled server-side
+                route_trend = fetch_or_empty(
+                    load_route_trend, *filter_key, selected_route_detailed,
+                    columns=('ts', 'val'))
+
+                fig_route_trend = px.line(
+                    route_trend,
+                    x='ts',
+                    y='val',
+                    title=f"Time Deviation Trend for {selected_route_detailed}",
+                    labels={'ts': 'Date', 'val': 'Avg Time Deviation (min)'}
+                )
+                st.plotly_chart(fig_route_trend, use_container_width=True)
+
+                # Recent trips table
+                st.subheader("Recent Trips")
+                recent_trips = route_data.nlargest(10, 'full_date')[
+                    ['full_date', 'actual_time', 'osrm_time', 'time_deviation', 'is_cutoff']
+                ]
+                st.dataframe(recent_trips, use_container_width=True)
+
         # Custom query interface
         st.subheader("Custom Analysis")
-        
+
         if st.checkbox("Enable Advanced Filtering"):
             col1, col2 = st.columns(2)
-            
+
             with col1:
                 min_distance = st.number_input("Minimum Distance (km)", value=0.0)
                 max_distance = st.number_input("Maximum Distance (km)", value=float(filtered_df['actual_distance_to_destination'].max()))
-            
+
             with col2:
                 min_time = st.number_input("Minimum Trip Time (min)", value=0.0)
                 max_time = st.number_input("Maximum Trip Time (min)", value=float(filtered_df['actual_time'].max()))
-            
-            # Apply advanced filters
-            advanced_filtered = filtered_df[
-                (filtered_df['actual_distance_to_destination'] >= min_distance) &
-                (filtered_df['actual_distance_to_destination'] <= max_distance) &
-                (filtered_df['actual_time'] >= min_time) &
-                (filtered_df['actual_time'] <= max_time)
-            ]
-            
+
+            # Apply advanced filters: one mask on the raw arrays, one indexing,
+            # no intermediate frames
+            dist_arr = filtered_df['actual_distance_to_destination'].to_numpy()
+            time_arr = filtered_df['actual_time'].to_numpy()
+            advanced_filtered = filtered_df.iloc[np.logical_and.reduce([
+                dist_arr >= min_distance,
+                dist_arr <= max_distance,
+                time_arr >= min_time,
+                time_arr <= max_time
+            ])]
+
             st.write(f"Filtered to {len(advanced_filtered)} trips")
-            
+
             if len(advanced_filtered) > 0:
                 # Custom scatter plot
                 fig_custom = px.scatter(
-                    advanced_filtered.sample(min(500, len(advanced_filtered))),
+                    sample_for_plot(filter_key + (min_distance, max_distance, min_time, max_time),
+                                    100_000, advanced_filtered),
                     x='actual_distance_to_destination',
                     y='actual_time',
                     color='time_deviation',
                     size='osrm_time',
                     hover_data=['route', 'is_cutoff'],
                     title="Custom Analysis: Distance vs Time",
-                    color_continuous_scale="RdYlBu_r"
+                    color_continuous_scale="RdYlBu_r",
+                    render_mode='webgl'
                 )
                 st.plotly_chart(fig_custom, use_container_width=True)
-    
+
     # Footer
     st.markdown("---")
     st.markdown("""
     <div style='text-align: center; color: #666; font-size: 0.8rem;'>
         📊 Delhivery Logistics Dashboard | Last Updated: {} | Total Records: {:,}
     </div>
-    """.format(datetime.now().strftime("%Y-%m-%d %H:%M"), len(df)), unsafe_allow_html=True)
+    """.format(datetime.now().strftime("%Y-%m-%d %H:%M"), len(filtered_df)), unsafe_allow_html=True)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()